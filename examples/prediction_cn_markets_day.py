@@ -24,11 +24,14 @@ Example:
 import os
 import argparse
 import time
+import random
+import numpy as np
 import pandas as pd
 import akshare as ak
 import matplotlib.pyplot as plt
 import sys
-sys.path.append("../")
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from model import Kronos, KronosTokenizer, KronosPredictor
 
 save_dir = "./outputs"
@@ -51,15 +54,25 @@ def load_data(symbol: str) -> pd.DataFrame:
     max_retries = 3
     df = None
 
-    # Retry mechanism
+    # Retry mechanism with exponential backoff and jitter
     for attempt in range(1, max_retries + 1):
+        retry_after = None
         try:
-            df = ak.stock_zh_a_hist(symbol=symbol, period="daily", adjust="")
+            df = ak.stock_zh_a_hist(symbol=symbol, period="daily", adjust="", timeout=10)
             if df is not None and not df.empty:
                 break
         except Exception as e:
             print(f"⚠️ Attempt {attempt}/{max_retries} failed: {e}")
-        time.sleep(1.5)
+            # Honor the server's Retry-After hint when rate limited (HTTP 429)
+            response = getattr(e, "response", None)
+            if response is not None and response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+        if attempt < max_retries:
+            if retry_after is not None and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = min(30.0, 0.5 * 2 ** attempt + random.uniform(0, 0.5))
+            time.sleep(delay)
 
     # If still empty after retries
     if df is None or df.empty:
@@ -76,30 +89,32 @@ def load_data(symbol: str) -> pd.DataFrame:
         "成交额": "amount"
     }, inplace=True)
 
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.sort_values("date").reset_index(drop=True)
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", cache=True)
+    # akshare returns ascending, non-overlapping daily bars, so only sort when needed
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date", ignore_index=True)
 
-    # Convert numeric columns
+    # Convert numeric columns (only text columns need separator / placeholder cleanup)
     numeric_cols = ["open", "high", "low", "close", "volume", "amount"]
-    for col in numeric_cols:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .replace({"--": None, "": None})
-        )
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Fix invalid open values
-    open_bad = (df["open"] == 0) | (df["open"].isna())
+    text_cols = [col for col in numeric_cols if not pd.api.types.is_numeric_dtype(df[col])]
+    if text_cols:
+        df[text_cols] = df[text_cols].replace({",": ""}, regex=True).replace({"--": None, "": None})
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+
+    # Fix invalid open values: use the previous close, or the same day's close when that is unavailable
+    open_values = df["open"].to_numpy()
+    close_values = df["close"].to_numpy()
+    open_bad = (open_values == 0) | np.isnan(open_values)
     if open_bad.any():
         print(f"⚠️  Fixed {open_bad.sum()} invalid open values.")
-        df.loc[open_bad, "open"] = df["close"].shift(1)
-        df["open"].fillna(df["close"], inplace=True)
+        prev_close = np.concatenate([close_values[:1], close_values[:-1]])
+        prev_close = np.where(np.isnan(prev_close), close_values, prev_close)
+        df["open"] = np.where(open_bad, prev_close, open_values)
 
-    # Fix missing amount
-    if df["amount"].isna().all() or (df["amount"] == 0).all():
-        df["amount"] = df["close"] * df["volume"]
+    # Fix missing amount (computed on the raw arrays, skipping pandas index alignment)
+    amount_values = df["amount"].to_numpy()
+    if np.isnan(amount_values).all() or (amount_values == 0).all():
+        df["amount"] = np.multiply(close_values, df["volume"].to_numpy())
 
     print(f"✅ Data loaded: {len(df)} rows, range: {df['date'].min()} ~ {df['date'].max()}")
 
@@ -187,7 +202,7 @@ def predict_future(symbol):
     df_out = pd.concat([
         df[["date", "open", "high", "low", "close", "volume", "amount"]],
         pred_df[["date", "open", "high", "low", "close", "volume", "amount"]]
-    ]).reset_index(drop=True)
+    ], ignore_index=True)
 
     # Save CSV
     out_file = os.path.join(save_dir, f"pred_{symbol.replace('.', '_')}_data.csv")
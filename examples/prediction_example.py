@@ -1,14 +1,183 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import torch
+import os
 import sys
-import akshare as ak
+import time
+import copy
+import functools
+import contextlib
+import random
+import threading
+import traceback
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-sys.path.append("../")
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from model import Kronos, KronosTokenizer, KronosPredictor
 
-# 设置 matplotlib 支持中文显示
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']  # 用来正常显示中文标签
-plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
+# akshare 和 matplotlib 导入较慢，只在真正获取数据/绘图时才按需导入
+
+
+# akshare中文列名到英文列名的映射
+AKSHARE_COLUMN_MAPPING = {
+    '日期': 'timestamps',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+    '成交额': 'amount'
+}
+
+
+def _to_utc(x, naive_tz='UTC'):
+    """
+    将时间序列、时间索引或单个时间戳统一转换为UTC时间
+    
+    参数:
+        x: pd.Series / pd.DatetimeIndex / pd.Timestamp，或可被 pd.to_datetime 解析的对象
+        naive_tz: 没有时区信息时假定的原始时区
+    """
+    if isinstance(x, pd.Series):
+        x = pd.to_datetime(x)
+        if x.dt.tz is None:
+            x = x.dt.tz_localize(naive_tz)
+        return x.dt.tz_convert('UTC')
+    if not isinstance(x, (pd.DatetimeIndex, pd.Timestamp)):
+        x = pd.to_datetime(x)
+    if x.tz is None:
+        x = x.tz_localize(naive_tz)
+    return x.tz_convert('UTC')
+
+
+# 进程内的历史数据缓存，键为 (股票代码, 周期, 开始日期, 结束日期, 复权方式)
+# 同一会话内重复请求相同区间时直接复用，避免重复的网络请求
+_HISTORY_CACHE = {}
+
+
+def _fetch_stock_hist(symbol, period, start_date, end_date, adjust="qfq"):
+    """
+    调用akshare获取原始历史行情（带缓存与重试机制）
+    
+    返回:
+        akshare返回的原始DataFrame（缓存副本，调用方可以随意修改）
+    """
+    cache_key = (symbol, period, start_date, end_date, adjust)
+    if cache_key in _HISTORY_CACHE:
+        print("命中缓存，跳过网络请求")
+        return _HISTORY_CACHE[cache_key].copy()
+    
+    import akshare as ak
+    
+    max_retries = 3
+    base_delay, max_delay = 1.0, 30.0
+    delay = base_delay
+    stock_data = None
+    
+    for attempt in range(1, max_retries + 1):
+        try:
+            if period == "daily":
+                # 日线数据，不指定日期范围可以获取更多数据
+                stock_data = ak.stock_zh_a_hist(
+                    symbol=symbol, 
+                    period="daily", 
+                    start_date=start_date, 
+                    end_date=end_date, 
+                    adjust=adjust,  # qfq: 前复权
+                    timeout=10  # 连接过慢时尽快失败并进入重试，而不是依赖TCP默认超时
+                )
+            else:
+                # 对于分钟级数据，暂时不支持，提示用户使用日线
+                raise ValueError("分钟级数据暂不支持，请使用日线数据（daily）")
+            
+            if stock_data is not None and not stock_data.empty:
+                break
+        except Exception as e:
+            print(f"⚠️ 尝试 {attempt}/{max_retries} 失败: {e}")
+            if attempt < max_retries:
+                # 去相关抖动退避（decorrelated jitter）：等待时间随失败次数增长且带随机性，避免同步重试
+                delay = min(max_delay, random.uniform(base_delay, delay * 3))
+                time.sleep(delay)
+            else:
+                raise
+    
+    if stock_data is not None and not stock_data.empty:
+        _HISTORY_CACHE[cache_key] = stock_data
+        return stock_data.copy()
+    return stock_data
+
+
+class OHLCVCache:
+    """
+    基于Parquet文件的本地行情缓存
+    
+    每个 (股票代码, 周期, 日期范围) 的处理结果保存为 <root>/<股票代码>/<周期>_<开始日期>_<结束日期>.parquet。
+    日线数据有效期为1天，分钟线为1小时；请求区间落在某个未过期的缓存区间之内时直接切片复用。
+    历史K线不会再变化，因此即使缓存文件的结束日期早于请求，只要其最后一根K线所在的周期尚未结束，也视为有效。
+    """
+
+    def __init__(self, root=".cache"):
+        self.root = Path(root)
+
+    def _ttl(self, period):
+        return timedelta(days=1) if period == "daily" else timedelta(hours=1)
+
+    def _bar_length(self, period):
+        return timedelta(days=1) if period == "daily" else timedelta(minutes=int(period))
+
+    def _is_fresh(self, df, period):
+        """最后一根K线所在的周期尚未结束，即缓存中不缺少任何已走完的K线"""
+        if df.empty:
+            return False
+        bar_length = self._bar_length(period)
+        return df['timestamps'].iloc[-1] + bar_length >= pd.Timestamp.now(tz='UTC')
+
+    def _path(self, symbol, start, end, period):
+        return self.root / symbol.replace("=", "_") / f"{period}_{start}_{end}.parquet"
+
+    def get(self, symbol, start, end, period):
+        """返回覆盖 [start, end] 的缓存数据，未命中或已过期时返回None"""
+        symbol_dir = self._path(symbol, start, end, period).parent
+        if not symbol_dir.is_dir():
+            return None
+        
+        expire_before = (datetime.now() - self._ttl(period)).timestamp()
+        # 结束日期越新的缓存越可能有效，优先检查
+        paths = sorted(symbol_dir.glob(f"{period}_*_*.parquet"), key=lambda p: p.stem.split("_")[2], reverse=True)
+        for path in paths:
+            _, cached_start, cached_end = path.stem.split("_")
+            if cached_start > start or cached_end > end:
+                continue
+            within_ttl = cached_end == end and path.stat().st_mtime >= expire_before
+            try:
+                df = pd.read_parquet(path)
+            except (ImportError, OSError, ValueError) as e:
+                print(f"⚠️ 读取缓存失败，改为重新下载: {e}")
+                return None
+            if not (within_ttl or self._is_fresh(df, period)):
+                continue
+            if cached_start < start:
+                # 缓存区间更大，只保留请求的部分（日期按北京时间计算）
+                # 缓存数据已按时间升序排列，二分查找起点后按位置切片，无需逐行比较生成布尔掩码
+                start_ts = pd.Timestamp(start).tz_localize('Asia/Shanghai')
+                first = df['timestamps'].searchsorted(start_ts)
+                if first > 0:
+                    df = df.iloc[first:].reset_index(drop=True)
+            return df
+        return None
+
+    def put(self, symbol, start, end, period, df):
+        path = self._path(symbol, start, end, period)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(path, compression="zstd")
+        except (ImportError, OSError) as e:
+            # 未安装pyarrow等情况下跳过本地缓存，不影响正常流程
+            print(f"⚠️ 写入缓存失败，已跳过: {e}")
+
+
+_OHLCV_CACHE = OHLCVCache()
 
 
 def get_stock_data_from_akshare(symbol, period="daily", days=500):
@@ -23,8 +192,6 @@ def get_stock_data_from_akshare(symbol, period="daily", days=500):
     返回:
         处理后的DataFrame，包含 open, high, low, close, volume, amount, timestamps 列
     """
-    import time
-    
     try:
         # 计算日期范围
         end_date = datetime.now().strftime('%Y%m%d')
@@ -33,112 +200,86 @@ def get_stock_data_from_akshare(symbol, period="daily", days=500):
         print(f"正在从akshare获取股票 {symbol} 的数据...")
         print(f"日期范围: {start_date} 至 {end_date}")
         
-        # 获取股票历史数据（带重试机制）
-        max_retries = 3
-        stock_data = None
+        # 优先读取本地缓存
+        cached = _OHLCV_CACHE.get(symbol, start_date, end_date, period)
+        if cached is not None:
+            print(f"✅ 从本地缓存读取 {len(cached)} 条数据")
+            return cached
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                if period == "daily":
-                    # 日线数据，不指定日期范围可以获取更多数据
-                    stock_data = ak.stock_zh_a_hist(
-                        symbol=symbol, 
-                        period="daily", 
-                        start_date=start_date, 
-                        end_date=end_date, 
-                        adjust="qfq"  # 前复权
-                    )
-                else:
-                    # 对于分钟级数据，暂时不支持，提示用户使用日线
-                    raise ValueError("分钟级数据暂不支持，请使用日线数据（daily）")
-                
-                if stock_data is not None and not stock_data.empty:
-                    break
-            except Exception as e:
-                print(f"⚠️ 尝试 {attempt}/{max_retries} 失败: {e}")
-                if attempt < max_retries:
-                    time.sleep(1.5)
-                else:
-                    raise
+        # 获取股票历史数据（带缓存与重试机制）
+        stock_data = _fetch_stock_hist(symbol, period, start_date, end_date)
         
         if stock_data is None or stock_data.empty:
             raise ValueError(f"未能获取到股票代码 {symbol} 的数据，请检查股票代码是否正确。")
         
-        # 转换列名：akshare返回的是中文列名，需要转换为英文
-        column_mapping = {
-            '日期': 'timestamps',
-            '开盘': 'open',
-            '收盘': 'close',
-            '最高': 'high',
-            '最低': 'low',
-            '成交量': 'volume',
-            '成交额': 'amount'
-        }
-        
-        # 重命名列
-        stock_data = stock_data.rename(columns=column_mapping)
-        
-        # 处理时间戳并转换为UTC时间
-        if 'timestamps' in stock_data.columns:
-            # 转换为datetime，假设原始数据是本地时间（中国时区）
-            stock_data['timestamps'] = pd.to_datetime(stock_data['timestamps'])
-            # 如果时间戳没有时区信息，假设是北京时间（UTC+8），然后转换为UTC
-            if stock_data['timestamps'].dt.tz is None:
-                # 假设原始数据是北京时间（UTC+8）
-                stock_data['timestamps'] = stock_data['timestamps'].dt.tz_localize('Asia/Shanghai')
-            # 转换为UTC时间
-            stock_data['timestamps'] = stock_data['timestamps'].dt.tz_convert('UTC')
-        else:
-            raise ValueError("数据中缺少日期列")
-        
-        # 按时间排序
-        stock_data = stock_data.sort_values('timestamps').reset_index(drop=True)
-        
-        # 转换数值列（处理可能的逗号分隔符和无效值）
-        numeric_cols = ["open", "high", "low", "close", "volume", "amount"]
-        for col in numeric_cols:
-            if col in stock_data.columns:
-                # 转换为字符串，移除逗号，处理无效值
-                stock_data[col] = (
-                    stock_data[col]
-                    .astype(str)
-                    .str.replace(",", "", regex=False)
-                    .replace({"--": None, "": None, "nan": None})
-                )
-                stock_data[col] = pd.to_numeric(stock_data[col], errors="coerce")
+        # 重命名列：akshare返回的是中文列名，需要转换为英文
+        stock_data = stock_data.rename(columns=AKSHARE_COLUMN_MAPPING)
         
         # 确保有必要的列
+        if 'timestamps' not in stock_data.columns:
+            raise ValueError("数据中缺少日期列")
         required_cols = ['open', 'high', 'low', 'close']
         for col in required_cols:
             if col not in stock_data.columns:
                 raise ValueError(f"数据中缺少必要的列: {col}")
         
-        # 修复无效的开盘价
-        open_bad = (stock_data["open"] == 0) | (stock_data["open"].isna())
-        if open_bad.any():
-            print(f"⚠️  修复了 {open_bad.sum()} 个无效的开盘价")
-            stock_data.loc[open_bad, "open"] = stock_data["close"].shift(1)
-            stock_data["open"].fillna(stock_data["close"], inplace=True)
-        
         # 确保有volume和amount列
         if 'volume' not in stock_data.columns:
             stock_data['volume'] = 0.0
         if 'amount' not in stock_data.columns:
             stock_data['amount'] = 0.0
         
-        # 修复缺失的成交额
-        if stock_data["amount"].isna().all() or (stock_data["amount"] == 0).all():
-            stock_data["amount"] = stock_data["close"] * stock_data["volume"]
+        # 先只保留需要的列，后续的类型转换和填充都只作用于这些列
+        numeric_cols = ["open", "high", "low", "close", "volume", "amount"]
+        stock_data = stock_data.reindex(columns=['timestamps'] + numeric_cols)
         
-        # 填充任何剩余的NaN值
-        stock_data = stock_data.ffill().bfill()
+        # 处理时间戳并转换为UTC时间（没有时区信息时假设是北京时间）
+        # akshare日线的日期格式固定为 YYYY-MM-DD，指定format可以跳过逐个元素的格式推断
+        stock_data['timestamps'] = _to_utc(
+            pd.to_datetime(stock_data['timestamps'], format='%Y-%m-%d', cache=True),
+            naive_tz='Asia/Shanghai'
+        )
         
-        # 选择需要的列
-        result_df = stock_data[['timestamps', 'open', 'high', 'low', 'close', 'volume', 'amount']].copy()
+        # 按时间排序（akshare返回的数据通常已按时间升序排列，此时跳过排序）
+        if not stock_data['timestamps'].is_monotonic_increasing:
+            stock_data = stock_data.sort_values('timestamps', ignore_index=True)
+        
+        # 转换数值列（处理可能的逗号分隔符和无效值），转换后即为最终的数值类型
+        # 只有字符串列才需要移除逗号、处理无效值，这些列一次性整块处理，已是数值的列直接跳过
+        text_cols = [col for col in numeric_cols if not pd.api.types.is_numeric_dtype(stock_data[col])]
+        if text_cols:
+            stock_data[text_cols] = (stock_data[text_cols]
+                                     .replace({",": ""}, regex=True)
+                                     .replace({"--": np.nan, "": np.nan, "nan": np.nan}))
+        stock_data[numeric_cols] = stock_data[numeric_cols].apply(pd.to_numeric, errors="coerce", downcast="float")
+        
+        # 修复无效的开盘价：用前一日收盘价替代，前一日收盘价不可用时（如第一行）用当日收盘价
+        open_values = stock_data["open"].to_numpy()
+        close_values = stock_data["close"].to_numpy()
+        open_bad = (open_values == 0) | np.isnan(open_values)
+        if open_bad.any():
+            print(f"⚠️  修复了 {open_bad.sum()} 个无效的开盘价")
+            prev_close = np.concatenate([close_values[:1], close_values[:-1]])
+            prev_close = np.where(np.isnan(prev_close), close_values, prev_close)
+            stock_data["open"] = np.where(open_bad, prev_close, open_values)
         
-        # 确保数据类型正确
-        for col in ['open', 'high', 'low', 'close', 'volume', 'amount']:
-            result_df[col] = pd.to_numeric(result_df[col], errors='coerce')
+        # 修复缺失的成交额（直接在NumPy数组上计算，跳过pandas的索引对齐）
+        amount_values = stock_data["amount"].to_numpy()
+        if np.isnan(amount_values).all() or (amount_values == 0).all():
+            stock_data["amount"] = np.multiply(close_values, stock_data["volume"].to_numpy())
+        
+        # 填充剩余的NaN值（行情数据通常没有缺失，先检查避免无谓地遍历整个表）
+        # 价格按线性插值填充；成交量/成交额缺失视为没有成交，插值没有意义，直接填0
+        if stock_data[numeric_cols].isna().to_numpy().any():
+            price_cols = ['open', 'high', 'low', 'close']
+            stock_data[price_cols] = stock_data[price_cols].interpolate(method='linear', limit_direction='both')
+            stock_data[['volume', 'amount']] = stock_data[['volume', 'amount']].fillna(0.0)
+        
+        # 数值列统一存为连续的float32块（与模型输入的精度一致），下游转换为张量时无需再做类型转换
+        result_df = pd.DataFrame(stock_data[numeric_cols].to_numpy(dtype=np.float32), columns=numeric_cols)
+        result_df.insert(0, 'timestamps', stock_data['timestamps'].array)
+        
+        _OHLCV_CACHE.put(symbol, start_date, end_date, period, result_df)
         
         print(f"✅ 成功获取 {len(result_df)} 条数据")
         print(f"数据范围: {result_df['timestamps'].min()} 至 {result_df['timestamps'].max()}")
@@ -146,135 +287,111 @@ def get_stock_data_from_akshare(symbol, period="daily", days=500):
         
     except Exception as e:
         print(f"获取数据时发生错误: {e}")
-        import traceback
         traceback.print_exc()
         raise
 
 
-def plot_prediction(kline_df, pred_df, lookback):
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """导入matplotlib.pyplot，并在第一次调用时设置中文显示"""
+    # 设置环境变量 KRONOS_HEADLESS，或者在非交互终端中运行且没有通过 MPLBACKEND 指定后端时，
+    # 使用无界面的Agg后端（必须在导入pyplot之前设置），避免在服务器/批处理任务中初始化GUI
+    if os.environ.get('KRONOS_HEADLESS') or (not os.environ.get('MPLBACKEND') and not sys.stdout.isatty()):
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    # 设置 matplotlib 支持中文显示
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']  # 用来正常显示中文标签
+    plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
+    return plt
+
+
+@functools.lru_cache(maxsize=2)
+def _date_formatter(is_long_span):
+    """x轴时间格式化器：时间跨度超过30天只显示日期，否则显示日期和时间"""
+    from matplotlib.dates import DateFormatter
+    if is_long_span:
+        return DateFormatter('%Y-%m-%d', tz='UTC')
+    return DateFormatter('%Y-%m-%d %H:%M', tz='UTC')
+
+
+def _plot_panel(ax, col, historical_df, actual_df, pred_df, ylabel, title, legend_loc):
+    """在一个子图上绘制某一列的历史值、真实值（如果有）和预测值"""
+    # 各段数据直接按各自的索引绘制，无需先对齐合并成一个DataFrame
+    # 绘制历史数据
+    ax.plot(historical_df.index, historical_df[col].values, label='历史值', color='gray', linewidth=1.5, alpha=0.7)
+    
+    # 如果有真实值，绘制真实值
+    if not actual_df.empty:
+        ax.plot(actual_df.index, actual_df[col].values, label='真实值', color='blue', linewidth=1.5)
+    
+    # 绘制预测值
+    ax.plot(pred_df.index, pred_df[col].values, label='预测值', color='red', linewidth=1.5, linestyle='--')
+    
+    ax.set_ylabel(ylabel, fontsize=14)
+    ax.legend(loc=legend_loc, fontsize=12)
+    ax.grid(True)
+    ax.set_title(title, fontsize=16)
+
+
+def plot_prediction(kline_df, pred_df, lookback, save_path=None):
+    """
+    绘制历史数据、真实值和预测值的对比图
+    
+    参数:
+        save_path: 图片保存路径；未指定时使用环境变量 KRONOS_PLOT_OUT。
+                   两者都没有时弹出窗口显示，使用无界面后端时则保存为 prediction.png
+    """
     # 确保使用时间戳作为索引（如果是UTC时间）
     if 'timestamps' in kline_df.columns:
         kline_df_indexed = kline_df.set_index('timestamps')
     else:
         kline_df_indexed = kline_df.copy()
     
-    # 确保pred_df的索引是UTC时间（pred_df应该已经使用y_timestamp作为索引）
-    if isinstance(pred_df.index, pd.DatetimeIndex):
-        if pred_df.index.tz is None:
-            pred_df.index = pred_df.index.tz_localize('UTC')
-        elif pred_df.index.tz != pd.Timestamp.now(tz='UTC').tz:
-            pred_df.index = pred_df.index.tz_convert('UTC')
-    else:
-        pred_df.index = pd.to_datetime(pred_df.index).tz_localize('UTC')
-    
-    # 确保kline_df的索引也是UTC时间
-    if isinstance(kline_df_indexed.index, pd.DatetimeIndex):
-        if kline_df_indexed.index.tz is None:
-            kline_df_indexed.index = kline_df_indexed.index.tz_localize('UTC')
-        elif kline_df_indexed.index.tz != pd.Timestamp.now(tz='UTC').tz:
-            kline_df_indexed.index = kline_df_indexed.index.tz_convert('UTC')
-    else:
-        kline_df_indexed.index = pd.to_datetime(kline_df_indexed.index).tz_localize('UTC')
+    # 时间戳在数据获取和生成预测时间时已统一为UTC，这里只需兼容没有时区信息的输入
+    # （DataFrame.tz_localize返回新对象，不会修改调用方的数据）
+    if pred_df.index.tz is None:
+        pred_df = pred_df.tz_localize('UTC')
+    if kline_df_indexed.index.tz is None:
+        kline_df_indexed = kline_df_indexed.tz_localize('UTC')
     
     # 分离历史数据和真实值（用于对比的部分）
     # 历史数据：前lookback条
     historical_df = kline_df_indexed.iloc[:lookback]
-    # 真实值（如果有）：lookback之后的部分，用于与预测值对比
-    if len(kline_df_indexed) > lookback:
-        actual_df = kline_df_indexed.iloc[lookback:]
-    else:
-        actual_df = pd.DataFrame()
-    
-    # 历史数据的收盘价和成交量
-    sr_close_hist = historical_df['close']
-    sr_volume_hist = historical_df['volume']
-    
-    # 预测值（使用pred_df自己的索引，这是未来时间戳）
-    sr_pred_close = pred_df['close']
-    sr_pred_volume = pred_df['volume']
-    
-    # 如果有真实值用于对比
-    if len(actual_df) > 0:
-        sr_close_actual = actual_df['close']
-        sr_volume_actual = actual_df['volume']
-        
-        # 合并历史、真实值和预测值
-        close_df = pd.DataFrame({
-            '历史值': sr_close_hist,
-            '真实值': sr_close_actual,
-            '预测值': sr_pred_close
-        })
-        volume_df = pd.DataFrame({
-            '历史值': sr_volume_hist,
-            '真实值': sr_volume_actual,
-            '预测值': sr_pred_volume
-        })
-    else:
-        # 只有历史值和预测值
-        close_df = pd.DataFrame({
-            '历史值': sr_close_hist,
-            '预测值': sr_pred_close
-        })
-        volume_df = pd.DataFrame({
-            '历史值': sr_volume_hist,
-            '预测值': sr_pred_volume
-        })
-
+    # 真实值（如果有）：lookback之后的部分，用于与预测值对比（没有时为空）
+    actual_df = kline_df_indexed.iloc[lookback:]
+    
+    plt = _pyplot()
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
 
-    # 绘制历史数据
-    ax1.plot(close_df['历史值'].index, close_df['历史值'], label='历史值', color='gray', linewidth=1.5, alpha=0.7)
-    
-    # 如果有真实值，绘制真实值
-    if '真实值' in close_df.columns:
-        ax1.plot(close_df['真实值'].index, close_df['真实值'], label='真实值', color='blue', linewidth=1.5)
-    
-    # 绘制预测值（使用pred_df自己的索引，这是未来时间戳）
-    ax1.plot(pred_df.index, pred_df['close'], label='预测值', color='red', linewidth=1.5, linestyle='--')
-    
-    ax1.set_ylabel('收盘价', fontsize=14)
-    ax1.legend(loc='lower left', fontsize=12)
-    ax1.grid(True)
-    ax1.set_title('收盘价预测对比', fontsize=16)
-    
-    # 格式化x轴时间显示，根据数据频率选择格式
-    # 合并所有时间索引
-    all_times = close_df['历史值'].index.union(pred_df.index)
-    if len(all_times) > 0:
-        time_span = (all_times.max() - all_times.min()).total_seconds()
-        if time_span > 86400 * 30:  # 超过30天，只显示日期
-            ax1.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%Y-%m-%d', tz='UTC'))
-        else:  # 少于30天，显示日期和时间
-            ax1.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%Y-%m-%d %H:%M', tz='UTC'))
-
-    # 绘制成交量
-    ax2.plot(volume_df['历史值'].index, volume_df['历史值'], label='历史值', color='gray', linewidth=1.5, alpha=0.7)
-    
-    # 如果有真实值，绘制真实值
-    if '真实值' in volume_df.columns:
-        ax2.plot(volume_df['真实值'].index, volume_df['真实值'], label='真实值', color='blue', linewidth=1.5)
-    
-    # 绘制预测值
-    ax2.plot(pred_df.index, pred_df['volume'], label='预测值', color='red', linewidth=1.5, linestyle='--')
-    
-    ax2.set_ylabel('成交量', fontsize=14)
+    # 绘制收盘价和成交量（预测值使用pred_df自己的索引，这是未来时间戳）
+    _plot_panel(ax1, 'close', historical_df, actual_df, pred_df, ylabel='收盘价', title='收盘价预测对比', legend_loc='lower left')
+    _plot_panel(ax2, 'volume', historical_df, actual_df, pred_df, ylabel='成交量', title='成交量预测对比', legend_loc='upper left')
     ax2.set_xlabel('时间', fontsize=14)
-    ax2.legend(loc='upper left', fontsize=12)
-    ax2.grid(True)
-    ax2.set_title('成交量预测对比', fontsize=16)
     
-    # 格式化x轴时间显示
-    if len(all_times) > 0:
-        if time_span > 86400 * 30:  # 超过30天，只显示日期
-            ax2.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%Y-%m-%d', tz='UTC'))
-        else:  # 少于30天，显示日期和时间
-            ax2.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%Y-%m-%d %H:%M', tz='UTC'))
+    # 格式化x轴时间显示，根据数据覆盖的时间跨度选择格式
+    # 数据均已按时间排序，直接取首尾计算跨度，无需合并时间索引
+    t_min = min(kline_df_indexed.index[0], pred_df.index[0])
+    t_max = max(kline_df_indexed.index[-1], pred_df.index[-1])
+    # sharex=True 的两个子图共用同一个刻度格式器，设置一次即可
+    ax2.xaxis.set_major_formatter(_date_formatter((t_max - t_min).total_seconds() > 86400 * 30))
     
     # 旋转x轴标签以便更好地显示
     plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45, ha='right')
 
     plt.tight_layout()
-    plt.show()
+    save_path = save_path or os.environ.get('KRONOS_PLOT_OUT')
+    if not save_path and plt.get_backend().lower() == 'agg':
+        # 无界面后端下 plt.show() 不会显示任何内容，改为保存到文件
+        save_path = "prediction.png"
+    if save_path:
+        fig.savefig(save_path, dpi=120)
+        print(f"预测图已保存至: {save_path}")
+    else:
+        plt.show()
+    # 释放图形占用的内存
+    plt.close(fig)
 
 
 def get_user_input():
@@ -332,6 +449,18 @@ def get_user_input():
         print("使用默认设备: cpu")
         device = "cpu"
     
+    # 获取采样次数（多条采样路径在同一批次中并行生成，结果取平均）
+    while True:
+        try:
+            sample_count_input = input("请输入采样次数（多次采样取平均，默认1）: ").strip()
+            sample_count = int(sample_count_input) if sample_count_input else 1
+            if sample_count < 1:
+                print("采样次数必须大于0，请重新输入")
+                continue
+            break
+        except ValueError:
+            print("请输入有效的数字")
+    
     # 计算需要获取的数据天数（至少需要lookback+pred_len，再加一些缓冲）
     days = max((lookback + pred_len) * 2, 500) if period == "daily" else max((lookback + pred_len) * 2, 30)
     
@@ -343,17 +472,86 @@ def get_user_input():
     print(f"  预测长度: {pred_len}")
     print(f"  数据周期: {period}")
     print(f"  设备: {device}")
+    print(f"  采样次数: {sample_count}")
     print("=" * 60)
     print()
     
-    return symbol, lookback, pred_len, period, device, days
+    return symbol, lookback, pred_len, period, device, sample_count, days
+
+
+@functools.lru_cache(maxsize=1)
+def load_model_and_tokenizer():
+    """加载Kronos分词器和模型（同一进程内多次调用时直接复用已加载的模型）"""
+    tokenizer = KronosTokenizer.from_pretrained("NeoQuasar/Kronos-Tokenizer-base")
+    model = Kronos.from_pretrained("NeoQuasar/Kronos-small")
+    return tokenizer.eval(), model.eval()
+
+
+def load_model_in_background():
+    """
+    在守护线程中加载模型和分词器，返回一个Future
+    
+    守护线程不会阻止进程退出：获取数据失败时主函数直接结束，无需等待模型下载完成。
+    """
+    future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(load_model_and_tokenizer())
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name="kronos-model-loader", daemon=True).start()
+    return future
+
+
+def _cpu_supports_bf16():
+    """当前CPU是否支持原生BF16运算（AVX512-BF16或AMX）"""
+    checks = [getattr(torch.cpu, name, None) for name in ("_is_avx512_bf16_supported", "_is_amx_tile_supported")]
+    return any(check() for check in checks if check is not None)
+
+
+def quantize_model(model):
+    """对模型中的Linear层做INT8动态量化（仅适用于CPU推理），权重占用约为原来的1/4"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _compile_with_fallback(fn):
+    """编译fn；编译失败时（如缺少C++编译器或遇到不支持的算子）回退到eager模式执行，只在调用期间放宽dynamo配置"""
+    compiled_fn = torch.compile(fn, dynamic=True)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with torch._dynamo.config.patch(suppress_errors=True):
+            return compiled_fn(*args, **kwargs)
+    return wrapper
+
+
+def compile_model(model):
+    """
+    返回一个使用torch.compile编译了自回归解码中每一步都会调用的两个方法的模型副本
+    
+    Kronos在推理时直接调用 decode_s1 / decode_s2 而不是 forward，因此分别编译这两个方法。
+    首次预测需要额外的编译时间，之后的调用会复用编译结果，适合多次预测的场景。
+    副本是与原模型共享参数的浅拷贝，load_model_and_tokenizer缓存的模型本身保持未编译状态。
+    """
+    compiled = copy.copy(model)
+    compiled.decode_s1 = _compile_with_fallback(model.decode_s1)
+    compiled.decode_s2 = _compile_with_fallback(model.decode_s2)
+    return compiled
 
 
 def main():
     """主函数"""
     try:
         # 获取用户输入
-        symbol, lookback, pred_len, period, device, days = get_user_input()
+        symbol, lookback, pred_len, period, device, sample_count, days = get_user_input()
+        
+        # 模型加载与行情数据下载互不依赖，放到后台线程中与数据获取同时进行
+        print("正在后台加载模型...")
+        model_future = load_model_in_background()
         
         # 1. 获取股票数据
         df = get_stock_data_from_akshare(symbol, period=period, days=days)
@@ -366,70 +564,96 @@ def main():
             if lookback < 50:
                 raise ValueError("数据量太少，无法进行预测")
         
-        # 2. 加载模型和分词器
-        print("\n正在加载模型...")
-        tokenizer = KronosTokenizer.from_pretrained("NeoQuasar/Kronos-Tokenizer-base")
-        model = Kronos.from_pretrained("NeoQuasar/Kronos-small")
+        # 2. 等待后台的模型和分词器加载完成
+        print("\n正在等待模型加载...")
+        tokenizer, model = model_future.result()
         print("模型加载完成")
         
         # 3. 实例化预测器
         print("正在初始化预测器...")
+        if device == "cpu":
+            # 使用本进程可用的全部CPU核心进行推理
+            cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+            torch.set_num_threads(cpu_count)
+        # 通过命令行参数 --int8 开启：CPU上将Linear层量化为INT8，预测结果与FP32相比会有少量偏差
+        use_int8 = "--int8" in sys.argv and device == "cpu"
+        if use_int8:
+            print("正在对模型进行INT8动态量化...")
+            model = quantize_model(model)
         predictor = KronosPredictor(model, tokenizer, device=device, max_context=512)
+        # 通过命令行参数 --compile 开启：GPU上可显著减少每步解码的内核启动开销，CPU上可融合算子
+        if "--compile" in sys.argv:
+            print("正在使用torch.compile编译模型（首次预测需要额外的编译时间）...")
+            predictor.model = compile_model(predictor.model)
         print("预测器初始化完成")
         
+        # KV缓存只在历史长度+预测长度不超过max_context时有效，超出后每步都要重新计算整个窗口
+        max_lookback = predictor.max_context - pred_len
+        if lookback > max_lookback >= 50:
+            print(f"提示：历史数据长度 {lookback} + 预测长度 {pred_len} 超过模型最大上下文 {predictor.max_context}，"
+                  f"历史数据长度调整为 {max_lookback} 以便全程使用KV缓存")
+            lookback = max_lookback
+        
         # 4. 准备数据
         print("\n正在准备预测数据...")
         # 使用最后lookback条数据作为历史数据（用于预测）
-        x_df = df.tail(lookback)[['open', 'high', 'low', 'close', 'volume', 'amount']]
-        x_timestamp = df.tail(lookback)['timestamps'].copy()
+        x_slice = df.iloc[-lookback:]
+        x_df = x_slice[['open', 'high', 'low', 'close', 'volume', 'amount']]
+        # 确保x_timestamp是UTC时间（tz_convert不修改原数据，无需先复制）
+        x_timestamp = _to_utc(x_slice['timestamps'])
         
-        # 确保x_timestamp是UTC时间
-        if x_timestamp.dt.tz is None:
-            x_timestamp = x_timestamp.dt.tz_localize('UTC')
-        elif x_timestamp.dt.tz != pd.Timestamp.now(tz='UTC').tz:
-            x_timestamp = x_timestamp.dt.tz_convert('UTC')
-        
-        # 生成未来时间戳（基于最后一个时间戳，使用UTC时间）
+        # 生成未来时间戳（基于最后一个时间戳，x_timestamp已是UTC时间）
         last_timestamp = x_timestamp.iloc[-1]
-        # 确保时间戳是UTC时间
-        if hasattr(last_timestamp, 'tz') and last_timestamp.tz is None:
-            last_timestamp = pd.Timestamp(last_timestamp).tz_localize('UTC')
-        elif hasattr(last_timestamp, 'tz') and last_timestamp.tz != pd.Timestamp.now(tz='UTC').tz:
-            last_timestamp = last_timestamp.tz_convert('UTC')
         
         if period == "daily":
             # 日线数据，每天一个点
-            y_timestamp = pd.Series(pd.date_range(
+            y_timestamp = pd.date_range(
                 start=last_timestamp + timedelta(days=1),
                 periods=pred_len,
                 freq='D',
                 tz='UTC'
-            ))
+            )
         else:
             # 分钟线数据
             minutes = int(period)
-            y_timestamp = pd.Series(pd.date_range(
+            y_timestamp = pd.date_range(
                 start=last_timestamp + timedelta(minutes=minutes),
                 periods=pred_len,
                 freq=f'{minutes}min',
                 tz='UTC'
-            ))
+            )
         
         # 5. 进行预测
         print(f"\n开始预测，预测长度: {pred_len}...")
         print(f"历史数据时间范围: {x_timestamp.iloc[0]} 至 {x_timestamp.iloc[-1]}")
-        print(f"预测时间范围: {y_timestamp.iloc[0]} 至 {y_timestamp.iloc[-1]}")
-        
-        pred_df = predictor.predict(
-            df=x_df,
-            x_timestamp=x_timestamp,
-            y_timestamp=y_timestamp,
-            pred_len=pred_len,
-            T=1.0,
-            top_p=0.9,
-            sample_count=1,
-            verbose=True
-        )
+        print(f"预测时间范围: {y_timestamp[0]} 至 {y_timestamp[-1]}")
+        
+        # 使用自动混合精度（优先BF16）推理，矩阵运算更快，KV缓存占用的内存也减半
+        # CPU只有在支持原生BF16指令时才启用，否则BF16运算反而更慢；INT8量化的模型保持FP32激活
+        if device.startswith("cuda"):
+            amp_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            amp_context = torch.autocast(device_type="cuda", dtype=amp_dtype)
+        elif not use_int8 and _cpu_supports_bf16():
+            amp_context = torch.autocast(device_type="cpu", dtype=torch.bfloat16)
+        else:
+            amp_context = contextlib.nullcontext()
+        
+        # 通过命令行参数 --deterministic 开启：每步直接取概率最大的token（贪心解码），结果可复现，适合回测/自动化测试
+        greedy = "--deterministic" in sys.argv
+        
+        with amp_context:
+            pred_df = predictor.predict(
+                df=x_df,
+                x_timestamp=x_timestamp,
+                y_timestamp=y_timestamp,
+                pred_len=pred_len,
+                T=1.0,
+                top_p=0.9,
+                sample_count=sample_count,
+                verbose=True,
+                use_kv_cache=True,
+                greedy=greedy
+            )
         
         # 确保pred_df使用y_timestamp作为索引
         if not pred_df.index.equals(y_timestamp):
@@ -455,7 +679,6 @@ def main():
         print("\n\n用户中断操作")
     except Exception as e:
         print(f"\n发生错误: {e}")
-        import traceback
         traceback.print_exc()
 
 
@@ -1,23 +1,17 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import sys
-sys.path.append("../")
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from model import Kronos, KronosTokenizer, KronosPredictor
 
 
 def plot_prediction(kline_df, pred_df):
-    pred_df.index = kline_df.index[-pred_df.shape[0]:]
-    sr_close = kline_df['close']
-    sr_pred_close = pred_df['close']
-    sr_close.name = 'Ground Truth'
-    sr_pred_close.name = "Prediction"
-
-    close_df = pd.concat([sr_close, sr_pred_close], axis=1)
-
+    pred_index = kline_df.index[-pred_df.shape[0]:]
     fig, ax = plt.subplots(1, 1, figsize=(8, 4))
 
-    ax.plot(close_df['Ground Truth'], label='Ground Truth', color='blue', linewidth=1.5)
-    ax.plot(close_df['Prediction'], label='Prediction', color='red', linewidth=1.5)
+    ax.plot(kline_df.index, kline_df['close'].values, label='Ground Truth', color='blue', linewidth=1.5)
+    ax.plot(pred_index, pred_df['close'].values, label='Prediction', color='red', linewidth=1.5)
     ax.set_ylabel('Close Price', fontsize=14)
     ax.legend(loc='lower left', fontsize=12)
     ax.grid(True)
@@ -34,13 +28,14 @@ model = Kronos.from_pretrained("NeoQuasar/Kronos-small")
 predictor = KronosPredictor(model, tokenizer, device="cuda:0", max_context=512)
 
 # 3. Prepare Data
-df = pd.read_csv("./data/XSHG_5min_600977.csv")
-df['timestamps'] = pd.to_datetime(df['timestamps'])
+feature_cols = ['open', 'high', 'low', 'close']
+df = pd.read_csv("./data/XSHG_5min_600977.csv", usecols=['timestamps'] + feature_cols,
+                 dtype={col: 'float32' for col in feature_cols}, parse_dates=['timestamps'])
 
 lookback = 400
 pred_len = 120
 
-x_df = df.loc[:lookback-1, ['open', 'high', 'low', 'close']]
+x_df = df.loc[:lookback-1, feature_cols]
 x_timestamp = df.loc[:lookback-1, 'timestamps']
 y_timestamp = df.loc[lookback:lookback+pred_len-1, 'timestamps']
 
@@ -275,7 +275,7 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
         s2_logits = self.head.cond_forward(x2)
         return s1_logits, s2_logits
 
-    def decode_s1(self, s1_ids, s2_ids, stamp=None, padding_mask=None):
+    def decode_s1(self, s1_ids, s2_ids, stamp=None, padding_mask=None, kv_caches=None):
         """
         Decodes only the s1 tokens.
 
@@ -287,6 +287,9 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
             s2_ids (torch.Tensor): Input tensor of s2 token IDs. Shape: [batch_size, seq_len]
             stamp (torch.Tensor, optional): Temporal stamp tensor. Shape: [batch_size, seq_len]. Defaults to None.
             padding_mask (torch.Tensor, optional): Mask for padding tokens. Shape: [batch_size, seq_len]. Defaults to None.
+            kv_caches (List[KVCache], optional): One cache per Transformer layer for incremental decoding. When given,
+                the inputs only hold the positions following the cached ones, and the outputs cover only those positions.
+                Defaults to None.
 
         Returns:
             Tuple[torch.Tensor, torch.Tensor]:
@@ -299,8 +302,8 @@ class Kronos(nn.Module, PyTorchModelHubMixin):
             x = x + time_embedding
         x = self.token_drop(x)
 
-        for layer in self.transformer:
-            x = layer(x, key_padding_mask=padding_mask)
+        for i, layer in enumerate(self.transformer):
+            x = layer(x, key_padding_mask=padding_mask, kv_cache=kv_caches[i] if kv_caches is not None else None)
 
         x = self.norm(x)
 
@@ -371,32 +374,38 @@ def top_k_top_p_filtering(
 
 
 def sample_from_logits(logits, temperature=1.0, top_k=None, top_p=None, sample_logits=True):
+    if not sample_logits:
+        # Temperature scaling and top-k/top-p filtering never change the most likely token,
+        # so greedy decoding skips them (and the softmax) and takes the argmax directly.
+        return torch.argmax(logits, dim=-1, keepdim=True)
+
     logits = logits / temperature
     if top_k is not None or top_p is not None:
         if top_k > 0 or top_p < 1.0:
             logits = top_k_top_p_filtering(logits, top_k=top_k, top_p=top_p)
 
     probs = F.softmax(logits, dim=-1)
-
-    if not sample_logits:
-        _, x = top_k(probs, k=1, dim=-1)
-    else:
-        x = torch.multinomial(probs, num_samples=1)
+    x = torch.multinomial(probs, num_samples=1)
 
     return x
 
 
-def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context, pred_len, clip=5, T=1.0, top_k=0, top_p=0.99, sample_count=5, verbose=False):
-    with torch.no_grad():
+def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context, pred_len, clip=5, T=1.0, top_k=0, top_p=0.99, sample_count=5, verbose=False, use_kv_cache=False, greedy=False):
+    if greedy:
+        # Greedy samples are identical, so a single path per series gives the same average
+        sample_count = 1
+
+    with torch.inference_mode():
         x = torch.clip(x, -clip, clip)
 
         device = x.device
-        x = x.unsqueeze(1).repeat(1, sample_count, 1, 1).reshape(-1, x.size(1), x.size(2)).to(device)
-        x_stamp = x_stamp.unsqueeze(1).repeat(1, sample_count, 1, 1).reshape(-1, x_stamp.size(1), x_stamp.size(2)).to(device)
-        y_stamp = y_stamp.unsqueeze(1).repeat(1, sample_count, 1, 1).reshape(-1, y_stamp.size(1), y_stamp.size(2)).to(device)
-
+        # Samples of a series only diverge once tokens are drawn, so the history is tokenized once per
+        # series and the tokens are replicated along the batch axis (sample_count rows per series).
         x_token = tokenizer.encode(x, half=True)
-        
+        x_token = [t.repeat_interleave(sample_count, dim=0) for t in x_token]
+        x_stamp = x_stamp.repeat_interleave(sample_count, dim=0).to(device)
+        y_stamp = y_stamp.repeat_interleave(sample_count, dim=0).to(device)
+
         initial_seq_len = x.size(1)
         batch_size = x_token[0].size(0)
         total_seq_len = initial_seq_len + pred_len
@@ -413,6 +422,13 @@ def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context
             pre_buffer[:, :buffer_len] = x_token[0][:, start_idx:start_idx + buffer_len]
             post_buffer[:, :buffer_len] = x_token[1][:, start_idx:start_idx + buffer_len]
 
+        # With a KV cache the context is prefilled once and each later step only feeds the newest token.
+        # This is exact while the sequence fits in max_context; once the window starts sliding, every
+        # position's hidden state changes, so generation falls back to recomputing the full window.
+        kv_caches = [KVCache(max_len=max_context) for _ in model.transformer] if use_kv_cache else None
+        context = None
+        context_buffer = None
+
         if verbose:
             ran = trange
         else:
@@ -421,25 +437,48 @@ def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context
             current_seq_len = initial_seq_len + i
             window_len = min(current_seq_len, max_context)
 
-            if current_seq_len <= max_context:
-                input_tokens = [
-                    pre_buffer[:, :window_len],
-                    post_buffer[:, :window_len]
-                ]
+            if kv_caches is not None and current_seq_len <= max_context:
+                if i == 0:
+                    # Prefill once per series and share the result across its samples
+                    s1_logits, context = model.decode_s1(pre_buffer[::sample_count, :current_seq_len],
+                                                         post_buffer[::sample_count, :current_seq_len],
+                                                         full_stamp[::sample_count, :current_seq_len, :].contiguous(),
+                                                         kv_caches=kv_caches)
+                    s1_logits = s1_logits.repeat_interleave(sample_count, dim=0)
+                    context = context.repeat_interleave(sample_count, dim=0)
+                    for cache in kv_caches:
+                        cache.repeat_interleave(sample_count)
+                    # Hidden states of cached positions never change, so keep them in a preallocated buffer
+                    context_buffer = context.new_empty(batch_size, max_context, context.size(-1))
+                    context_buffer[:, :current_seq_len] = context
+                else:
+                    s1_logits, new_context = model.decode_s1(pre_buffer[:, current_seq_len - 1:current_seq_len],
+                                                             post_buffer[:, current_seq_len - 1:current_seq_len],
+                                                             full_stamp[:, current_seq_len - 1:current_seq_len, :].contiguous(),
+                                                             kv_caches=kv_caches)
+                    context_buffer[:, current_seq_len - 1:current_seq_len] = new_context
+                    context = context_buffer[:, :current_seq_len]
             else:
-                input_tokens = [pre_buffer, post_buffer]
-
-            context_end = current_seq_len
-            context_start = max(0, context_end - max_context)
-            current_stamp = full_stamp[:, context_start:context_end, :].contiguous()
-
-            s1_logits, context = model.decode_s1(input_tokens[0], input_tokens[1], current_stamp)
+                kv_caches = None
+                if current_seq_len <= max_context:
+                    input_tokens = [
+                        pre_buffer[:, :window_len],
+                        post_buffer[:, :window_len]
+                    ]
+                else:
+                    input_tokens = [pre_buffer, post_buffer]
+
+                context_end = current_seq_len
+                context_start = max(0, context_end - max_context)
+                current_stamp = full_stamp[:, context_start:context_end, :].contiguous()
+
+                s1_logits, context = model.decode_s1(input_tokens[0], input_tokens[1], current_stamp)
             s1_logits = s1_logits[:, -1, :]
-            sample_pre = sample_from_logits(s1_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+            sample_pre = sample_from_logits(s1_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=not greedy)
 
             s2_logits = model.decode_s2(context, sample_pre)
             s2_logits = s2_logits[:, -1, :]
-            sample_post = sample_from_logits(s2_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=True)
+            sample_post = sample_from_logits(s2_logits, temperature=T, top_k=top_k, top_p=top_p, sample_logits=not greedy)
 
             generated_pre[:, i] = sample_pre.squeeze(-1)
             generated_post[:, i] = sample_post.squeeze(-1)
@@ -463,19 +502,21 @@ def auto_regressive_inference(tokenizer, model, x, x_stamp, y_stamp, max_context
         ]
         z = tokenizer.decode(input_tokens, half=True)
         z = z.reshape(-1, sample_count, z.size(1), z.size(2))
-        preds = z.cpu().numpy()
+        preds = z.float().cpu().numpy()
         preds = np.mean(preds, axis=1)
 
         return preds
 
 
 def calc_time_stamps(x_timestamp):
+    # Accept both a datetime Series and a DatetimeIndex
+    x_timestamp = pd.DatetimeIndex(x_timestamp)
     time_df = pd.DataFrame()
-    time_df['minute'] = x_timestamp.dt.minute
-    time_df['hour'] = x_timestamp.dt.hour
-    time_df['weekday'] = x_timestamp.dt.weekday
-    time_df['day'] = x_timestamp.dt.day
-    time_df['month'] = x_timestamp.dt.month
+    time_df['minute'] = x_timestamp.minute
+    time_df['hour'] = x_timestamp.hour
+    time_df['weekday'] = x_timestamp.weekday
+    time_df['day'] = x_timestamp.day
+    time_df['month'] = x_timestamp.month
     return time_df
 
 
@@ -495,18 +536,18 @@ class KronosPredictor:
         self.tokenizer = self.tokenizer.to(self.device)
         self.model = self.model.to(self.device)
 
-    def generate(self, x, x_stamp, y_stamp, pred_len, T, top_k, top_p, sample_count, verbose):
+    def generate(self, x, x_stamp, y_stamp, pred_len, T, top_k, top_p, sample_count, verbose, use_kv_cache=True, greedy=False):
 
-        x_tensor = torch.from_numpy(np.array(x).astype(np.float32)).to(self.device)
-        x_stamp_tensor = torch.from_numpy(np.array(x_stamp).astype(np.float32)).to(self.device)
-        y_stamp_tensor = torch.from_numpy(np.array(y_stamp).astype(np.float32)).to(self.device)
+        x_tensor = torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32)).to(self.device)
+        x_stamp_tensor = torch.from_numpy(np.ascontiguousarray(x_stamp, dtype=np.float32)).to(self.device)
+        y_stamp_tensor = torch.from_numpy(np.ascontiguousarray(y_stamp, dtype=np.float32)).to(self.device)
 
         preds = auto_regressive_inference(self.tokenizer, self.model, x_tensor, x_stamp_tensor, y_stamp_tensor, self.max_context, pred_len,
-                                          self.clip, T, top_k, top_p, sample_count, verbose)
+                                          self.clip, T, top_k, top_p, sample_count, verbose, use_kv_cache, greedy)
         preds = preds[:, -pred_len:, :]
         return preds
 
-    def predict(self, df, x_timestamp, y_timestamp, pred_len, T=1.0, top_k=0, top_p=0.9, sample_count=1, verbose=True):
+    def predict(self, df, x_timestamp, y_timestamp, pred_len, T=1.0, top_k=0, top_p=0.9, sample_count=1, verbose=True, use_kv_cache=True, greedy=False):
 
         if not isinstance(df, pd.DataFrame):
             raise ValueError("Input must be a pandas DataFrame.")
@@ -527,9 +568,9 @@ class KronosPredictor:
         x_time_df = calc_time_stamps(x_timestamp)
         y_time_df = calc_time_stamps(y_timestamp)
 
-        x = df[self.price_cols + [self.vol_col, self.amt_vol]].values.astype(np.float32)
-        x_stamp = x_time_df.values.astype(np.float32)
-        y_stamp = y_time_df.values.astype(np.float32)
+        x = df[self.price_cols + [self.vol_col, self.amt_vol]].to_numpy(dtype=np.float32)
+        x_stamp = x_time_df.to_numpy(dtype=np.float32)
+        y_stamp = y_time_df.to_numpy(dtype=np.float32)
 
         x_mean, x_std = np.mean(x, axis=0), np.std(x, axis=0)
 
@@ -540,7 +581,7 @@ class KronosPredictor:
         x_stamp = x_stamp[np.newaxis, :]
         y_stamp = y_stamp[np.newaxis, :]
 
-        preds = self.generate(x, x_stamp, y_stamp, pred_len, T, top_k, top_p, sample_count, verbose)
+        preds = self.generate(x, x_stamp, y_stamp, pred_len, T, top_k, top_p, sample_count, verbose, use_kv_cache, greedy)
 
         preds = preds.squeeze(0)
         preds = preds * (x_std + 1e-5) + x_mean
@@ -549,7 +590,7 @@ class KronosPredictor:
         return pred_df
 
 
-    def predict_batch(self, df_list, x_timestamp_list, y_timestamp_list, pred_len, T=1.0, top_k=0, top_p=0.9, sample_count=1, verbose=True):
+    def predict_batch(self, df_list, x_timestamp_list, y_timestamp_list, pred_len, T=1.0, top_k=0, top_p=0.9, sample_count=1, verbose=True, use_kv_cache=True, greedy=False):
         """
         Perform parallel (batch) prediction on multiple time series. All series must have the same historical length and prediction length (pred_len).
 
@@ -563,6 +604,11 @@ class KronosPredictor:
             top_p (float): Top-p (nucleus sampling) threshold.
             sample_count (int): Number of parallel samples per series, automatically averaged internally.
             verbose (bool): Whether to display autoregressive progress.
+            use_kv_cache (bool): Whether to decode incrementally with a key/value cache instead of recomputing
+                                 the whole context at every step (default True). Once history + generated steps
+                                 exceed max_context, decoding falls back to full-window recomputation.
+            greedy (bool): Whether to decode deterministically by always taking the most likely token
+                           (default False). T, top_k and top_p are ignored and a single path is generated.
 
         Returns:
             List[pd.DataFrame]: List of prediction results in the same order as input, each DataFrame contains
@@ -607,9 +653,9 @@ class KronosPredictor:
             x_time_df = calc_time_stamps(x_timestamp)
             y_time_df = calc_time_stamps(y_timestamp)
 
-            x = df[self.price_cols + [self.vol_col, self.amt_vol]].values.astype(np.float32)
-            x_stamp = x_time_df.values.astype(np.float32)
-            y_stamp = y_time_df.values.astype(np.float32)
+            x = df[self.price_cols + [self.vol_col, self.amt_vol]].to_numpy(dtype=np.float32)
+            x_stamp = x_time_df.to_numpy(dtype=np.float32)
+            y_stamp = y_time_df.to_numpy(dtype=np.float32)
 
             if x.shape[0] != x_stamp.shape[0]:
                 raise ValueError(f"Inconsistent lengths at index {i}: x has {x.shape[0]} vs x_stamp has {x_stamp.shape[0]}.")
@@ -635,11 +681,12 @@ class KronosPredictor:
         if len(set(y_lens)) != 1:
             raise ValueError(f"Parallel prediction requires all series to have consistent prediction lengths, got: {y_lens}")
 
-        x_batch = np.stack(x_list, axis=0).astype(np.float32)           # (B, seq_len, feat)
-        x_stamp_batch = np.stack(x_stamp_list, axis=0).astype(np.float32) # (B, seq_len, time_feat)
-        y_stamp_batch = np.stack(y_stamp_list, axis=0).astype(np.float32) # (B, pred_len, time_feat)
+        # All per-series arrays are already float32, so stacking alone yields the final batch buffers
+        x_batch = np.stack(x_list, axis=0)             # (B, seq_len, feat)
+        x_stamp_batch = np.stack(x_stamp_list, axis=0) # (B, seq_len, time_feat)
+        y_stamp_batch = np.stack(y_stamp_list, axis=0) # (B, pred_len, time_feat)
 
-        preds = self.generate(x_batch, x_stamp_batch, y_stamp_batch, pred_len, T, top_k, top_p, sample_count, verbose)
+        preds = self.generate(x_batch, x_stamp_batch, y_stamp_batch, pred_len, T, top_k, top_p, sample_count, verbose, use_kv_cache, greedy)
         # preds: (B, pred_len, feat)
 
         pred_dfs = []
@@ -291,17 +291,26 @@ class RotaryPositionalEmbedding(nn.Module):
         self.sin_cached = None
 
     def _update_cos_sin_cache(self, x, seq_len):
-        if seq_len != self.seq_len_cached:
-            self.seq_len_cached = seq_len
-            t = torch.arange(seq_len, device=x.device).type_as(self.inv_freq)
-            freqs = torch.einsum('i,j->ij', t, self.inv_freq)
-            emb = torch.cat((freqs, freqs), dim=-1).to(x.device)
-            self.cos_cached = emb.cos()[None, None, :, :]
-            self.sin_cached = emb.sin()[None, None, :, :]
-        return self.cos_cached, self.sin_cached
-
-    def forward(self, q, k):
-        cos, sin = self._update_cos_sin_cache(q, q.shape[-2])
+        if self.seq_len_cached is None or seq_len > self.seq_len_cached:
+            # Grow in powers of two so incremental decoding rarely rebuilds the table
+            self.seq_len_cached = 1 << (seq_len - 1).bit_length()
+            # The table outlives the call that builds it, so never make it an inference tensor:
+            # a later training forward could not save it for backward
+            with torch.inference_mode(False):
+                t = torch.arange(self.seq_len_cached, device=x.device).type_as(self.inv_freq)
+                freqs = torch.einsum('i,j->ij', t, self.inv_freq)
+                emb = torch.cat((freqs, freqs), dim=-1).to(x.device)
+                self.cos_cached = emb.cos()[None, None, :, :]
+                self.sin_cached = emb.sin()[None, None, :, :]
+        return self.cos_cached[:, :, :seq_len, :], self.sin_cached[:, :, :seq_len, :]
+
+    def forward(self, q, k, offset=0):
+        """
+        Rotates q and k. `offset` is the position of the first query/key, used when the
+        preceding positions are held in a KVCache.
+        """
+        cos, sin = self._update_cos_sin_cache(q, offset + q.shape[-2])
+        cos, sin = cos[:, :, offset:, :], sin[:, :, offset:, :]
         return (
             (q * cos) + (self._rotate_half(q) * sin),
             (k * cos) + (self._rotate_half(k) * sin),
@@ -312,6 +321,52 @@ class RotaryPositionalEmbedding(nn.Module):
         return torch.cat((-x2, x1), dim=-1)
 
 
+class KVCache:
+    """
+    Key/value cache of one self-attention layer for incremental autoregressive decoding.
+
+    Stores the (already rotated) keys and values of every position processed so far,
+    so that each decoding step only has to project and attend from the newest tokens.
+
+    Args:
+        max_len (int, optional): If given, the cache is allocated once with room for `max_len`
+            positions and new keys/values are written in place, instead of concatenating a new
+            tensor at every step. Keeping the storage fixed avoids per-step reallocation and is
+            friendlier to torch.compile / CUDA graphs.
+    """
+
+    def __init__(self, max_len=None):
+        self.max_len = max_len
+        self.k = None
+        self.v = None
+        self.seq_len = 0
+
+    def update(self, k, v):
+        """Appends new keys/values of shape [batch, n_heads, new_len, head_dim] and returns the full cache."""
+        start, end = self.seq_len, self.seq_len + k.size(2)
+        if self.max_len is None:
+            if self.k is not None:
+                k = torch.cat([self.k, k], dim=2)
+                v = torch.cat([self.v, v], dim=2)
+            self.k, self.v = k, v
+        else:
+            if end > self.max_len:
+                raise ValueError(f"KVCache overflow: {end} positions exceed max_len={self.max_len}.")
+            if self.k is None:
+                self.k = k.new_empty(k.size(0), k.size(1), self.max_len, k.size(3))
+                self.v = v.new_empty(v.size(0), v.size(1), self.max_len, v.size(3))
+            self.k[:, :, start:end] = k
+            self.v[:, :, start:end] = v
+        self.seq_len = end
+        return self.k[:, :, :end], self.v[:, :, :end]
+
+    def repeat_interleave(self, repeats):
+        """Replicates every cached batch row `repeats` times, e.g. to share one prefill across samples."""
+        if self.k is not None:
+            self.k = self.k.repeat_interleave(repeats, dim=0)
+            self.v = self.v.repeat_interleave(repeats, dim=0)
+
+
 class MultiHeadAttentionWithRoPE(nn.Module):
     def __init__(self, d_model, n_heads, attn_dropout_p=0.0, resid_dropout_p=0.0):
         super().__init__()
@@ -327,26 +382,43 @@ class MultiHeadAttentionWithRoPE(nn.Module):
         self.attn_dropout_p = attn_dropout_p
         self.resid_dropout = nn.Dropout(resid_dropout_p)
 
-    def forward(self, x, key_padding_mask=None):
+    def forward(self, x, key_padding_mask=None, kv_cache=None):
+        """
+        Args:
+            x (torch.Tensor): Input of shape [batch, seq_len, d_model].
+            key_padding_mask (torch.Tensor, optional): Padding mask of shape [batch, seq_len]. Not supported together with kv_cache.
+            kv_cache (KVCache, optional): Cache of the preceding positions. When given, `x` only holds the new
+                positions, which attend to all cached positions plus (causally) to each other, and the cache is
+                extended with their keys/values.
+        """
         batch_size, seq_len, _ = x.shape
 
         q = self.q_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
         k = self.k_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
         v = self.v_proj(x).view(batch_size, seq_len, self.n_heads, self.head_dim).transpose(1, 2)
 
-        q, k = self.rotary(q, k)
+        past_len = kv_cache.seq_len if kv_cache is not None else 0
+        q, k = self.rotary(q, k, offset=past_len)
+        if kv_cache is not None:
+            k, v = kv_cache.update(k, v)
 
+        is_causal = True
         if key_padding_mask is not None:
             attn_mask = key_padding_mask.unsqueeze(1).unsqueeze(2)  # [batch, 1, 1, seq_len]
             attn_mask = attn_mask.expand(-1, self.n_heads, seq_len, -1)  # [batch, n_heads, q_len, k_len]
         else:
             attn_mask = None
+            if past_len > 0:
+                # New queries come after all cached keys, so the causal mask is aligned to the bottom right
+                is_causal = False
+                if seq_len > 1:
+                    attn_mask = torch.ones(seq_len, past_len + seq_len, dtype=torch.bool, device=x.device).tril(diagonal=past_len)
 
         attn_output = F.scaled_dot_product_attention(
             q, k, v,
             attn_mask=attn_mask,
             dropout_p=self.attn_dropout_p if self.training else 0.0,
-            is_causal=True
+            is_causal=is_causal
         )
 
         attn_output = attn_output.transpose(1, 2).contiguous().view(batch_size, seq_len, self.d_model)
@@ -470,10 +542,10 @@ class TransformerBlock(nn.Module):
         self.norm2 = RMSNorm(d_model)
         self.ffn = FeedForward(d_model, ff_dim, ffn_dropout_p)
 
-    def forward(self, x, key_padding_mask=None):
+    def forward(self, x, key_padding_mask=None, kv_cache=None):
         residual = x
         x = self.norm1(x)
-        attn_out = self.self_attn(x, key_padding_mask=key_padding_mask)
+        attn_out = self.self_attn(x, key_padding_mask=key_padding_mask, kv_cache=kv_cache)
         x = residual + attn_out
 
         residual = x
@@ -0,0 +1,103 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from model import Kronos, KronosPredictor, KronosTokenizer
+
+TEST_DATA_ROOT = Path(__file__).parent / "data"
+INPUT_DATA_PATH = TEST_DATA_ROOT / "regression_input.csv"
+
+# Tiny randomly initialised models, so these tests need no pretrained weights
+FEATURE_NAMES = ["open", "high", "low", "close", "volume", "amount"]
+MAX_CTX_LEN = 32
+PRED_LEN = 6
+SEED = 123
+DEVICE = "cpu"
+
+
+def set_seed(seed: int) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def build_predictor():
+    set_seed(0)
+    tokenizer = KronosTokenizer(d_in=6, d_model=32, n_heads=4, ff_dim=64, n_enc_layers=2, n_dec_layers=2,
+                                ffn_dropout_p=0.0, attn_dropout_p=0.0, resid_dropout_p=0.0, s1_bits=6, s2_bits=6,
+                                beta=0.05, gamma0=1.0, gamma=1.1, zeta=0.05, group_size=4)
+    model = Kronos(s1_bits=6, s2_bits=6, n_layers=2, d_model=32, n_heads=4, ff_dim=64, ffn_dropout_p=0.0,
+                   attn_dropout_p=0.0, resid_dropout_p=0.0, token_dropout_p=0.0, learn_te=True)
+    tokenizer.eval()
+    model.eval()
+    return KronosPredictor(model, tokenizer, device=DEVICE, max_context=MAX_CTX_LEN)
+
+
+def load_inputs(context_len):
+    df = pd.read_csv(INPUT_DATA_PATH, parse_dates=["timestamps"])
+    context_df = df.iloc[:context_len]
+    future_timestamp = df["timestamps"].iloc[context_len:context_len + PRED_LEN].reset_index(drop=True)
+    return context_df[FEATURE_NAMES].reset_index(drop=True), context_df["timestamps"].reset_index(drop=True), future_timestamp
+
+
+def test_training_after_prediction():
+    predictor = build_predictor()
+    x_df, x_timestamp, y_timestamp = load_inputs(MAX_CTX_LEN - PRED_LEN)
+    predictor.predict(df=x_df, x_timestamp=x_timestamp, y_timestamp=y_timestamp, pred_len=PRED_LEN, verbose=False)
+
+    # State built while decoding (e.g. the rotary embedding table) must stay usable for autograd
+    model = predictor.model.train()
+    ids = torch.randint(0, 2 ** 6, (2, 16))
+    s1_logits, _ = model(ids, ids)
+    s1_logits.mean().backward()
+    assert all(p.grad is not None for p in model.transformer.parameters())
+
+
+@pytest.mark.parametrize("context_len", [MAX_CTX_LEN - PRED_LEN, MAX_CTX_LEN - 2, MAX_CTX_LEN + 8])
+def test_kv_cache_matches_full_recompute(context_len):
+    # The last two lengths run past max_context, where cached decoding falls back to full-window recompute
+    predictor = build_predictor()
+    x_df, x_timestamp, y_timestamp = load_inputs(context_len)
+
+    outputs = []
+    for use_kv_cache in (True, False):
+        set_seed(SEED)
+        pred_df = predictor.predict(df=x_df, x_timestamp=x_timestamp, y_timestamp=y_timestamp, pred_len=PRED_LEN,
+                                    T=1.0, top_k=0, top_p=0.9, sample_count=2, verbose=False, use_kv_cache=use_kv_cache)
+        outputs.append(pred_df[FEATURE_NAMES].to_numpy(dtype=np.float32))
+
+    np.testing.assert_allclose(outputs[0], outputs[1], rtol=1e-5)
+
+
+def test_kv_cache_matches_full_recompute_batch():
+    predictor = build_predictor()
+    inputs = [load_inputs(MAX_CTX_LEN - 2), load_inputs(MAX_CTX_LEN - 2)]
+    inputs[1] = (inputs[1][0] * 2.0, inputs[1][1], inputs[1][2])
+
+    outputs = []
+    for use_kv_cache in (True, False):
+        set_seed(SEED)
+        pred_dfs = predictor.predict_batch([i[0] for i in inputs], [i[1] for i in inputs], [i[2] for i in inputs],
+                                           pred_len=PRED_LEN, sample_count=2, verbose=False, use_kv_cache=use_kv_cache)
+        outputs.append(np.stack([p[FEATURE_NAMES].to_numpy(dtype=np.float32) for p in pred_dfs]))
+
+    np.testing.assert_allclose(outputs[0], outputs[1], rtol=1e-5)
+
+
+@pytest.mark.parametrize("use_kv_cache", [True, False])
+def test_greedy_is_deterministic(use_kv_cache):
+    predictor = build_predictor()
+    x_df, x_timestamp, y_timestamp = load_inputs(MAX_CTX_LEN - 2)
+
+    outputs = []
+    for seed in (SEED, SEED + 1):
+        set_seed(seed)
+        pred_df = predictor.predict(df=x_df, x_timestamp=x_timestamp, y_timestamp=y_timestamp, pred_len=PRED_LEN,
+                                    T=1.0, top_p=0.9, sample_count=3, verbose=False, use_kv_cache=use_kv_cache, greedy=True)
+        outputs.append(pred_df[FEATURE_NAMES].to_numpy(dtype=np.float32))
+
+    np.testing.assert_array_equal(outputs[0], outputs[1])